@@ -5,29 +5,77 @@
 """
 
 from mpmath import mp
+import cmath
 import itertools
-import functools
+import collections
 import random
 import pandas as pd
 import numpy as np
 import warnings
 
+# Numba is optional; if it is available it is used to compile the scalar loops in this package.
+try:
+    import numba
+except ImportError:
+    numba = None
+
+def _maybe_njit(f):
+    """ Compile f with Numba if Numba is installed, and otherwise return it unchanged. """
+    if numba is None:
+        return f
+    return numba.njit(cache=True)(f)
+
 def simple_det(M):
     return M[0,0]*M[1,1]-M[0,1]*M[1,0]
 
 def simple_inv(M):
     """ Invert a 2x2 matrix. """
 
+    d = 1/(M[0,0]*M[1,1]-M[0,1]*M[1,0])
+
     # Weird type introspection to allow us to pass in pyadic types that mpmath doesn't like but numpy is OK with
-    MatrixType = type(M)
     if isinstance(M, np.ndarray):
-        MatrixType = np.array
-    return 1/(M[0,0]*M[1,1]-M[0,1]*M[1,0]) * MatrixType([[M[1,1],-M[0,1]], [-M[1,0], M[0,0]]])
+        N = np.empty((2,2), dtype=np.result_type(M.dtype, float))
+        N[0,0] = d*M[1,1]
+        N[0,1] = -d*M[0,1]
+        N[1,0] = -d*M[1,0]
+        N[1,1] = d*M[0,0]
+        return N
+    return type(M)([[d*M[1,1], -d*M[0,1]], [-d*M[1,0], d*M[0,0]]])
+
+def _mul_entries(a1, b1, c1, d1, a2, b2, c2, d2):
+    """ Entries (in row-major order) of the product of the 2x2 matrices with entries (a1,b1,c1,d1) and (a2,b2,c2,d2). """
+    return a1*a2 + b1*c2, a1*b2 + b1*d2, c1*a2 + d1*c2, c1*b2 + d1*d2
 
 def simple_tr(M):
     """ Trace of a 2x2 matrix. """
     return M[0,0] + M[1,1]
 
+def _mc_walk_points(G, letters, base, rtl):
+    """ Images of `base` along the random walks with the given letters.
+
+        G is the (2n, 2, 2) array of generators and inverses, letters is the (depth, count) array of
+        letters of the walks, and base is a point of the projective line as a vector of length 2.
+        Returns the (depth, count, 2) array of images of `base` under the words of each walk.
+
+        This is written in terms of scalars so that it can be compiled by Numba.
+    """
+    depth, count = letters.shape
+    points = np.empty((depth, count, 2), dtype=np.complex128)
+    for j in range(count):
+        a, b, c, d = 1+0j, 0j, 0j, 1+0j
+        for t in range(depth):
+            g = G[letters[t,j]]
+            if rtl:
+                a, b, c, d = g[0,0]*a + g[0,1]*c, g[0,0]*b + g[0,1]*d, g[1,0]*a + g[1,1]*c, g[1,0]*b + g[1,1]*d
+            else:
+                a, b, c, d = a*g[0,0] + b*g[1,0], a*g[0,1] + b*g[1,1], c*g[0,0] + d*g[1,0], c*g[0,1] + d*g[1,1]
+            points[t,j,0] = a*base[0] + b*base[1]
+            points[t,j,1] = c*base[0] + d*base[1]
+    return points
+
+_mc_walk_points = _maybe_njit(_mc_walk_points)
+
 class NonUnitDeterminantWarning(RuntimeWarning):
     pass
 
@@ -46,34 +94,65 @@ class GroupCache:
 
     """
 
+    __slots__ = ('length', 'generators', 'gen_to_inv', '_allowed_next', 'relators', '_relator_trie', '_underlying_matrix_t',
+                 '_gen_entries', '_entry_dtype', '_word_cache', '_cache_size', '_prefix_trie', '_prefix_lru')
+
     def inv_word(self, word):
         """ Returns the inverse of `word`. """
-        return tuple(reversed(tuple(self.gen_to_inv[x] for x in word)))
+        gen_to_inv = self.gen_to_inv
+        return tuple(gen_to_inv[x] for x in reversed(word))
 
-    def __init__(self, generators, relators=[], disable_det_warning=False):
+    def __init__(self, generators, relators=[], disable_det_warning=False, cache_size=1<<16, inverses=None):
         """ Construct a GroupCache from a finite list of generators and relations.
 
             Arguments:
             generators -- a finite list of 2x2 NumPy arrays.
             relators -- a list of words in the group.
             disable_det_warning -- if using p-adic numbers, this check hits a RecursionError in pyadic. ***DO NOT SET TO True UNLESS YOU KNOW WHAT YOU ARE DOING!!!***
+            cache_size -- the number of evaluated words to remember (least recently used words are forgotten first); None for no limit.
+              This also bounds the other caches of the group, such as that of prefix_product().
+            inverses -- the inverses of the generators, if they are known in closed form; by default they are computed with simple_inv().
 
         """
 
-        if not disable_det_warning:
-            for n, g in enumerate(generators):
-                det = simple_det(g)
-                if abs(det - 1) > 0.00001 and abs(-det - 1) > 0.00001:
-                    warnings.warn(f"generator {n} does not seem to have non-unit determinant {det}",NonUnitDeterminantWarning)
+        # We only care about the determinant up to sign, so test det^2 = 1.
+        if not disable_det_warning and len(generators) > 0:
+            G = np.stack(generators) if isinstance(generators[0], np.ndarray) else None
+            if G is not None and G.dtype != object:
+                dets = G[:,0,0]*G[:,1,1] - G[:,0,1]*G[:,1,0]
+                bad = np.flatnonzero(np.abs(dets*dets - 1) > 0.00001)
+                for n in bad.tolist():
+                    warnings.warn(f"generator {n} does not seem to have unit determinant {dets[n]}",NonUnitDeterminantWarning)
+            else:
+                for n, g in enumerate(generators):
+                    det = simple_det(g)
+                    if abs(det*det - 1) > 0.00001:
+                        warnings.warn(f"generator {n} does not seem to have unit determinant {det}",NonUnitDeterminantWarning)
 
         self.length = len(generators)
         if self.length == 0:
             generators = [mp.eye(2)] # The empty group is generated by one element.
             self.length = 1
-        inverses = [simple_inv(g) for g in generators]
-        self.generators = generators + inverses
-        self.gen_to_inv = [r for r in itertools.chain(range(self.length,2*self.length), range(0,self.length))]
-        self.relators = relators + [self.inv_word(r) for r in relators] + list(itertools.chain.from_iterable([(g, self.gen_to_inv[g]), (self.gen_to_inv[g], g)] for g in range(0,self.length)))
+        if inverses is None:
+            inverses = [simple_inv(g) for g in generators]
+        self.generators = list(generators) + list(inverses)
+        self.gen_to_inv = tuple(itertools.chain(range(self.length,2*self.length), range(0,self.length)))
+        # _allowed_next[x] is the tuple of letters which may be placed next to x in a freely reduced word.
+        self._allowed_next = tuple(tuple(y for y in range(2*self.length) if y != self.gen_to_inv[x]) for x in range(2*self.length))
+        rels = [tuple(r) for r in relators]
+        rels.extend([self.inv_word(r) for r in rels])
+        for g in range(0,self.length):
+            rels.append((g, self.gen_to_inv[g]))
+            rels.append((self.gen_to_inv[g], g))
+        self.relators = tuple(rels)
+
+        # Prefix tree of the relators: nested dicts keyed by letter, where the key None marks the end of a relator.
+        self._relator_trie = {}
+        for r in self.relators:
+            node = self._relator_trie
+            for x in r:
+                node = node.setdefault(x, {})
+            node[None] = True
 
         # Weird type introspection to allow us to pass in pyadic types that mpmath doesn't like but numpy is OK with
         if isinstance(generators[0], np.ndarray):
@@ -81,22 +160,123 @@ class GroupCache:
         else:
             self._underlying_matrix_t = type(generators[0])
 
-    @functools.cache
+        # For NumPy generators the cost of `@` on a 2x2 matrix is almost all dispatch overhead, so products of
+        # words are multiplied out on the (Python scalar) entries instead. mpmath matrices gain nothing from this.
+        if isinstance(generators[0], np.ndarray):
+            self._gen_entries = tuple(tuple(g.ravel().tolist()) for g in self.generators)
+            self._entry_dtype = np.result_type(*self.generators)
+        else:
+            self._gen_entries = None
+
+        # Matrices of words that have been evaluated, keyed by the whole word, in order of last use.
+        self._word_cache = collections.OrderedDict()
+        self._cache_size = cache_size
+
+        # Trie of the prefixes of the words passed to prefix_product(). Each node is a list [product of the prefix,
+        # {letter: child node}] (the product is a tuple of entries for NumPy generators), and the root is the empty word.
+        self._prefix_trie = [self[()] if self._gen_entries is None else (1, 0, 0, 1), {}]
+        # The nodes of the trie other than the root, as id(node): (node, parent, letter), in order of last use.
+        self._prefix_lru = collections.OrderedDict()
+
     def __getitem__(self, word):
         """ Given a word in the generators, return the corresponding matrix. """
+        cache = self._word_cache
+        try:
+            M = cache[word]
+        except KeyError:
+            pass
+        else:
+            cache.move_to_end(word)
+            return M
+
         if word == ():
-            return self._underlying_matrix_t([[1,0],[0,1]])
+            M = self._underlying_matrix_t([[1,0],[0,1]])
+        elif word[1:] in cache:
+            # Words are usually grown on the left (e.g. by free_cayley_graph_locally), so the tail is often known already.
+            if self._gen_entries is None:
+                M = self.generators[word[0]] @ cache[word[1:]]
+            else:
+                M = self._from_entries(_mul_entries(*self._gen_entries[word[0]], *cache[word[1:]].ravel().tolist()))
         else:
-            return self.generators[word[0]] @ self[word[1:]]
+            M = self._multiply_out(self.generators[word[0]], word[1:])
+        self._remember(cache, word, M)
+        return M
+
+    def _remember(self, cache, key, value):
+        """ Store `value` in the OrderedDict `cache`, forgetting the least recently used entry if there are more than cache_size. """
+        cache[key] = value
+        if self._cache_size is not None and len(cache) > self._cache_size:
+            cache.popitem(last=False)
+
+    def prefix_product(self, word):
+        """ Given a word in the generators, return the corresponding matrix, sharing work between words with common prefixes.
+
+            The products of all prefixes of `word` are remembered, and the product for a new word starts
+            from the longest prefix of it which has been seen before. This is worthwhile when evaluating a
+            family of words which agree on long initial segments (e.g. Farey words of nearby slopes); for
+            words grown on the left, __getitem__ already reuses the common part.
+
+            At most cache_size prefixes are remembered; the least recently used ones are forgotten first.
+        """
+        entries = self._gen_entries
+        generators = self.generators
+        lru = self._prefix_lru
+        path = []
+        node = self._prefix_trie
+        for x in word:
+            child = node[1].get(x)
+            if child is None:
+                M = node[0] @ generators[x] if entries is None else _mul_entries(*node[0], *entries[x])
+                child = [M, {}]
+                node[1][x] = child
+            path.append((child, node, x))
+            node = child
+
+        if self._cache_size is not None:
+            # Mark the nodes used from the deepest up, so that a node is always used more recently than its
+            # children; then the least recently used node is a leaf and can be forgotten on its own.
+            for item in reversed(path):
+                key = id(item[0])
+                lru[key] = item
+                lru.move_to_end(key)
+            while len(lru) > self._cache_size:
+                _, (_, parent, x) = lru.popitem(last=False)
+                del parent[1][x]
+
+        return node[0] if entries is None else self._from_entries(node[0])
+
+    def _multiply_out(self, M, letters):
+        """ Return the matrix M multiplied on the right by the generators in `letters`. """
+        if self._gen_entries is None:
+            for x in letters:
+                M = M @ self.generators[x]
+            return M
+
+        entries = self._gen_entries
+        a, b, c, d = M.ravel().tolist()
+        for x in letters:
+            a, b, c, d = _mul_entries(a, b, c, d, *entries[x])
+        return self._from_entries((a, b, c, d))
+
+    def _from_entries(self, entries):
+        """ Build a NumPy matrix from a tuple of its entries in row-major order. """
+        a, b, c, d = entries
+        return np.array([[a, b], [c, d]], dtype=self._entry_dtype)
 
     def __len__(self):
         """ Return the number of generators (not including inverses). """
         return self.length
 
-    @functools.cache
     def is_reduced_from_left(self, word):
         """ Return true if a word starts with any known relator."""
-        return not any(word[:len(r)] == r for r in self.relators)
+        node = self._relator_trie
+        for x in word:
+            if None in node:
+                return False
+            node = node.get(x)
+            if node is None:
+                return True
+        return None not in node
 
     def free_random_walk_locally(self, word, rtl=True):
         """ Given a word, produce a single neighbouring longer word randomly.
@@ -108,14 +288,13 @@ class GroupCache:
             the free group on the given generators.
         """
         if word == ():
-            return random.choice([(w,) for w in range(2*self.length)])
+            return (random.randrange(2*self.length),)
         else:
+            # Every entry of _allowed_next has exactly 2*length - 1 letters.
             if rtl:
-                lab = random.choice([x for x in range(2*self.length) if x != self.gen_to_inv[word[0]]])
-                return (lab,) + word
+                return (self._allowed_next[word[0]][random.randrange(2*self.length - 1)],) + word
             else:
-                lab = random.choice([x for x in range(2*self.length) if x != self.gen_to_inv[word[-1]]])
-                return word + (lab,)
+                return word + (self._allowed_next[word[-1]][random.randrange(2*self.length - 1)],)
 
     def random_walk_locally(self, word):
         """ Given a word, produce a single neighbouring longer non-left-reducable word randomly.
@@ -125,7 +304,7 @@ class GroupCache:
             start with any known relator.
         """
         if word == ():
-            return random.choice([(w,) for w in range(2*self.length)])
+            return (random.randrange(2*self.length),)
         else:
             words = []
             for x in range(2*self.length):
@@ -148,13 +327,12 @@ class GroupCache:
         if word == ():
             yield from [(w,) for w in range(2*self.length)]
         else:
-            for lab in range(2*self.length):
-                if rtl:
-                    if lab != self.gen_to_inv[word[0]]:
-                        yield (lab,) + word
-                else:
-                    if lab != self.gen_to_inv[word[-1]]:
-                        yield word + (lab,)
+            if rtl:
+                for lab in self._allowed_next[word[0]]:
+                    yield (lab,) + word
+            else:
+                for lab in self._allowed_next[word[-1]]:
+                    yield word + (lab,)
 
     def cayley_graph_locally(self, word):
         """ Given a word, produce all neighbouring non-left-reducible words.
@@ -168,16 +346,22 @@ class GroupCache:
         else:
             for lab in range(2*self.length):
                 lword = (lab,) + word
-                if is_reduced_from_left(lword):
+                if self.is_reduced_from_left(lword):
                     yield lword
 
-    def free_cayley_graph_bfs(self, depth):
+    def free_cayley_graph_bfs(self, depth, max_frontier=None):
         """ Breadth-first search for all words in the generators, assuming no relators.
 
             Walk the Cayley graph of the free group on the given generators, yielding
             words in a breadth-first way, producing all words of length at most `depth`.
             If the group is not free, this process will produce the group elements
             multiple times, labelled by different words differing by relators.
+
+            The number of words of each length grows exponentially, and a breadth-first search
+            has to hold a whole level in memory. If `max_frontier` is given then as soon as a level
+            contains more than `max_frontier` words, the remaining levels are produced by a depth-first
+            search below each word of that level. The same words are produced, but after that point they
+            no longer come in order of length.
         """
         last_list = [()]
         for n in range(depth):
@@ -187,6 +371,18 @@ class GroupCache:
                     yield item
                     this_list.append(item)
             last_list = this_list
+            if max_frontier is not None and len(last_list) > max_frontier:
+                for w in last_list:
+                    yield from self._free_cayley_graph_dfs(w, depth - n - 1)
+                return
+
+    def _free_cayley_graph_dfs(self, word, depth):
+        """ Depth-first search for the words obtained by adding at most `depth` letters to the left of `word`. """
+        if depth == 0:
+            return
+        for item in self.free_cayley_graph_locally(word):
+            yield item
+            yield from self._free_cayley_graph_dfs(item, depth - 1)
 
     def free_cayley_graph_mc(self, depth, count, rtl=True):
         """ Monte-Carlo search for all words in the generators, assuming no relators.
@@ -200,10 +396,25 @@ class GroupCache:
         """
         for nn in range(count):
             word = ()
-            for n in range(depth):
-                word = self.free_random_walk_locally(word, rtl)
+            for x in self._free_random_letters(depth):
+                word = (x,) + word if rtl else word + (x,)
                 yield word
 
+    def _free_random_letters(self, depth):
+        """ Yield the `depth` letters of a random walk in the free group, in the order they are added.
+
+            Each letter is chosen uniformly from those which are not the inverse of the previous letter.
+        """
+        if depth == 0:
+            return
+        n = 2*self.length
+        allowed = self._allowed_next
+        x = random.randrange(n)
+        yield x
+        for _ in range(depth - 1):
+            x = allowed[x][random.randrange(n - 1)]
+            yield x
+
     def cayley_graph_bfs(self, depth):
         """ Breadth-first search for all words in the generators, assuming no relators.
 
@@ -239,7 +450,7 @@ class GroupCache:
                 if yield_shorter or n == depth:
                     yield word
 
-    def coloured_limit_set_mc(self, depth, count, seed = 0, complexify=complex, rtl=True):
+    def coloured_limit_set_mc(self, depth, count, seed = 0, complexify=complex, rtl=True, precision='full'):
         """ Monte-carlo search for points in the limit set.
 
             Produce `depth`*`count` translates of the element `seed`, thus approximating the limit set,
@@ -247,21 +458,104 @@ class GroupCache:
 
             Generates: a dataframe with columns [ x, y, colour ] where x+yi is a point in the limit set
             and colour is the index of the first element in the word indexing that limit set.
+
+            If the generators are NumPy arrays then all of the walks are performed simultaneously
+            using batched matrix products.
+
+            If `precision` is 'fast' then the generators are first rounded to complex128 and the walks are
+            done in hardware floating point as for NumPy generators; this is much faster than mpmath and is
+            usually all that is needed for pictures. If `precision` is 'full' the generators are used as given.
         """
+        if precision not in ('full', 'fast'):
+            raise ValueError(f"precision should be 'full' or 'fast', not {precision!r}")
+
+        if precision == 'fast':
+            G = np.array([[[complex(g[0,0]), complex(g[0,1])], [complex(g[1,0]), complex(g[1,1])]] for g in self.generators], dtype=np.complex128)
+            base = np.array([[1],[0]], dtype=np.complex128) if seed == mp.inf else np.array([[complex(seed)],[1]], dtype=np.complex128)
+            return self._coloured_limit_set_mc_batched(G, depth, count, base, complexify, rtl)
+
         if seed == mp.inf:
             base = self._underlying_matrix_t([[1],[0]])
         else:
             base = self._underlying_matrix_t([[seed],[1]])
 
+        if self._underlying_matrix_t is np.array:
+            return self._coloured_limit_set_mc_batched(np.stack(self.generators), depth, count, base, complexify, rtl)
+
+        # Rather than building each word and evaluating it from scratch, keep the running product
+        # along the walk and update it by one generator per step.
         def _internal_generator():
-            for w in self.free_cayley_graph_mc(depth,count, rtl):
-                point = self[w] @ base
-                if point[1] != 0:
-                    cpx = complexify(point[0,0]/point[1,0])
-                    yield (cpx.real, cpx.imag, w[0])
+            generators = self.generators
+            identity = self[()]
+            for nn in range(count):
+                point = base
+                product = identity
+                colour = None
+                for x in self._free_random_letters(depth):
+                    if rtl:
+                        point = generators[x] @ point
+                        colour = x
+                    else:
+                        product = product @ generators[x]
+                        point = product @ base
+                        if colour is None:
+                            colour = x
+                    if point[1] != 0:
+                        cpx = complexify(point[0,0]/point[1,0])
+                        yield (cpx.real, cpx.imag, colour)
 
         return pd.DataFrame(_internal_generator(), columns=['x','y','colour'])
 
+    def _coloured_limit_set_mc_batched(self, G, depth, count, base, complexify, rtl):
+        """ Implementation of coloured_limit_set_mc for generators given as a (2n, 2, 2) NumPy array G.
+
+            The `count` random walks are advanced together, so each of the `depth` steps is a single
+            batched matrix product over an array of shape (count, 2, 2). If Numba is installed and the
+            entries are numeric, the walks are instead evaluated by the compiled scalar loop _mc_walk_points.
+        """
+        if depth == 0 or count == 0:
+            return pd.DataFrame([], columns=['x','y','colour'])
+
+        n = 2*self.length
+        allowed = np.array(self._allowed_next)
+        # Seed NumPy from the random module, so that random.seed() makes every path of coloured_limit_set_mc reproducible.
+        rng = np.random.default_rng(random.getrandbits(64))
+        letters = np.empty((depth, count), dtype=int)
+        letters[0] = rng.integers(n, size=count)
+        for t in range(1, depth):
+            letters[t] = allowed[letters[t-1], rng.integers(n-1, size=count)]
+
+        if numba is not None and G.dtype != object and base.dtype != object:
+            points = _mc_walk_points(G.astype(np.complex128), letters, base[:,0].astype(np.complex128), rtl)
+        elif rtl:
+            points = np.empty((depth, count, 2), dtype=np.result_type(G, base))
+            # Only the image of the base point is needed, so carry vectors rather than matrices.
+            point = G[letters[0]] @ base
+            points[0] = point[:,:,0]
+            for t in range(1, depth):
+                point = G[letters[t]] @ point
+                points[t] = point[:,:,0]
+        else:
+            points = np.empty((depth, count, 2), dtype=np.result_type(G, base))
+            product = G[letters[0]]
+            points[0] = (product @ base)[:,:,0]
+            for t in range(1, depth):
+                product = product @ G[letters[t]]
+                points[t] = (product @ base)[:,:,0]
+        colours = letters if rtl else np.broadcast_to(letters[0], letters.shape)
+
+        # Put the points in the same order as free_cayley_graph_mc would produce them: walk by walk.
+        points = points.transpose(1,0,2).reshape(-1,2)
+        colours = colours.T.reshape(-1)
+        mask = (points[:,1] != 0).astype(bool)
+        ratios = points[mask,0]/points[mask,1]
+        if complexify is complex and ratios.dtype != object:
+            cpx = ratios.astype(complex)
+        else:
+            cpx = np.array([complexify(z) for z in ratios], dtype=complex)
+
+        return pd.DataFrame({'x': cpx.real, 'y': cpx.imag, 'colour': colours[mask]})
+
     def coloured_limit_set_fast(self, count, seed=0, complexify=complex):
         """ Monte-carlo search for points in the limit set.
 
@@ -276,13 +570,16 @@ class GroupCache:
         else:
             base = self._underlying_matrix_t([[seed],[1]])
         def _internal_generator(base):
-            last = next(self.free_cayley_graph_mc(1,1))
+            generators = self.generators
+            n = 2*self.length
+            allowed = self._allowed_next
+            x = random.randrange(n)
             for _ in range(count):
-                base = self[last] @ base
+                base = generators[x] @ base
                 if base[1] != 0:
                     cpx = complexify(base[0,0]/base[1,0])
-                    yield (cpx.real, cpx.imag, last[0])
-                last = self.free_random_walk_locally(last)[:1]
+                    yield (cpx.real, cpx.imag, x)
+                x = allowed[x][random.randrange(n - 1)]
 
         return pd.DataFrame(_internal_generator(base), columns=['x','y','colour'])
 
@@ -293,11 +590,11 @@ class GroupCache:
             Returns: (centre, radius) where centre is complex and radius is real.
         """
         m = self[word]
-        if m[1,0] == 0:
+        c = m[1,0]
+        if c == 0:
             return (mp.inf,mp.inf)
-        centre = -m[1,1]/m[1,0]
-        radius = mp.fabs(1/m[1,0])
-        return (centre, radius)
+        inv_c = 1/c
+        return (-m[1,1]*inv_c, mp.fabs(inv_c))
 
     def coloured_isometric_circles_mc(self, depth, count):
         """ Monte-carlo search for isometric circles in the limit set.
@@ -309,15 +606,7 @@ class GroupCache:
             of an isometric circle of given radius, corresponding to a word whose first letter is
             the generator indexed by `colour`.
         """
-
-        def _internal_generator():
-            for w in self.cayley_graph_mc(depth,count):
-                centre, radius = self.isometric_circle(w)
-                if centre == mp.inf:
-                    continue
-                yield [float(centre.real), float(centre.imag), float(radius), w[0]]
-
-        return pd.DataFrame.from_records(_internal_generator(), columns=['x','y','radius','colour'])
+        return self._coloured_isometric_circles(self.cayley_graph_mc(depth,count))
 
     def coloured_isometric_circles_bfs(self, depth):
         """ Breadth-first search for isometric circles in the limit set.
@@ -326,15 +615,28 @@ class GroupCache:
             of an isometric circle of given radius, corresponding to a word whose first letter is
             the generator indexed by `colour`.
         """
+        return self._coloured_isometric_circles(self.cayley_graph_bfs(depth))
 
-        def _internal_generator():
-            for w in self.cayley_graph_bfs(depth):
-                centre, radius = self.isometric_circle(w)
-                if centre == mp.inf:
-                    continue
-                yield [float(centre.real), float(centre.imag), float(radius), w[0]]
+    def _coloured_isometric_circles(self, words):
+        """ Collect the isometric circles of `words` into a dataframe with columns [ x, y, radius, colour ].
 
-        return pd.DataFrame.from_records(_internal_generator(), columns=['x','y','radius','colour'])
+            The columns are accumulated separately and handed to pandas in one go, rather than row by row.
+        """
+        xs = []
+        ys = []
+        radii = []
+        colours = []
+        for w in words:
+            centre, radius = self.isometric_circle(w)
+            if centre == mp.inf:
+                continue
+            xs.append(float(centre.real))
+            ys.append(float(centre.imag))
+            radii.append(float(radius))
+            colours.append(w[0])
+
+        return pd.DataFrame({'x': np.array(xs, dtype=float), 'y': np.array(ys, dtype=float),
+                             'radius': np.array(radii, dtype=float), 'colour': np.array(colours, dtype=int)})
 
     def fixed_points(self, word):
         """ Compute the fixed points of `word` as it acts on the projective line."""
@@ -444,78 +746,30 @@ def action_on_circles(M, oph = True):
         of M on the space of circles just described.
     """
 
-    # Translate M into an action on the coordinate vector of a circle (c.f. [beardon, Theorem 3.2.3]).
-    # For this we need to split M up into a product of translations, dilatations, rigid motions, and circle inversions.
-    # We take the decomposition listed in [Maskit, I.C.2].
-
-    a = M[0,0]
-    b = M[0,1]
-    c = M[1,0]
-    d = M[1,1]
-
-    def orthogonal_transform(A):
-        B = mp.eye(4)
-        B[1:3,1:3] = A
-        return B
-
-    def dilate(k):
-        return mp.diag([1,k,k,k**2])
-
-    def unit_circle_reflect():
-        return mp.matrix([[0,0,0,1],[0,1,0,0],[0,0,1,0],[1,0,0,0]])
-
-    def translate(u):
-        return mp.matrix([[1,0,0,0],[u.real,1,0,0],[u.imag,0,1,0],[abs(u)**2, 2*u.real, 2*u.imag, 1]])
-
-    def reflect_in_circle(centre, radius):
-        return translate(centre) @ dilate(radius) @ unit_circle_reflect() @ dilate(1/radius) @ translate(-centre)
-
-    # Useful orthogonal 2x2 matrix
-    def rotate(theta):
-        return mp.matrix([[mp.cos(theta),-mp.sin(theta)],[mp.sin(theta),mp.cos(theta)]])
-    def reflect_in_x():
-        return mp.matrix([[1,0],[0,-1]])
-
-    def reflect_in_bisector(p, q):
-        theta = mp.pi/2 + mp.arg(p-q)
-        return translate((p+q)/2) @ orthogonal_transform(reflect_in_x() @ rotate(-2*theta)) @ translate(-(p+q)/2)
-
-    # If c is 0 we have a Euclidean motion, otherwise we follow I.C.2 of Maskit
-    if c != 0:
-        alpha = -d/c
-        alphaprime = a/c
-        rad = 1/abs(c)
-
-        # p is reflection in the isometric circle, q is reflection in bisector of the line joining the iso circle centres.
-        p = reflect_in_circle(alpha,rad)
-        q = reflect_in_bisector(alpha,alphaprime) if alpha != alphaprime else mp.eye(4)
-
-        # r is rotation with a reflection if oph = False
-        # here theta is the rotation between the isometric circle (alpha, rad) and the circle (alphaprime, rad)
-        if alpha != alphaprime:
-            base_point_1 = rad/abs(alpha-alphaprime) * alpha + (1-rad/abs(alpha-alphaprime)) * alphaprime
-            base_point_2 = rad/abs(alpha-alphaprime) * alphaprime + (1-rad/abs(alpha-alphaprime)) * alpha
-        else:
-            base_point_1 = alpha + rad*1j
-            base_point_2 = base_point_1
-        moved_point = M @ mp.matrix([base_point_1,1])
-        moved_point = moved_point[0]/moved_point[1]
-        theta = mp.arg( (moved_point - alphaprime) / (base_point_2 - alphaprime) )
-        # need to know if r is orientation preserving or not.
-        # f = r.q.p; since p is always orientation reversing, if f is orientation preserving then r is orientation reversing iff q is trivial
-        if oph and (q == mp.eye(4)):
-            # If we are reflecting then the angle of rotation will be off by pi.
-            r = translate(alphaprime) @ orthogonal_transform(rotate(theta - mp.pi)) @ orthogonal_transform(reflect_in_x()) @ translate(-alphaprime)
-        else:
-            r = translate(alphaprime) @ orthogonal_transform(rotate(theta)) @ translate(-alphaprime)
+    # A circle is the zero set of the Hermitian form H(z) = [z 1]^* [[a0, -(a1+i a2)], [-(a1-i a2), a3]] [z 1],
+    # so its image under M is the zero set of N^* H N where N = [[p,q],[r,s]] is the adjugate of M (which
+    # is M^-1 up to a scalar, and we are working projectively). Expanding N^* H N and reading off the
+    # coefficients gives the matrix below.
 
-        return r @ q @ p
-    else:
-        # The transformation is z -> (a/d) z + b/d possibly with a conjugation
-        if oph:
-            return translate(b/d) @ dilate(a/d)
-        else:
-            return translate(b/d) @ dilate(a/d) @ orthogonal_transform(reflect_in_x())
+    p = M[1,1]
+    q = -M[0,1]
+    r = -M[1,0]
+    s = M[0,0]
+
+    pq = mp.conj(p)*q
+    rs = mp.conj(r)*s
+    ps = mp.conj(p)*s
+    rq = mp.conj(r)*q
+    pr = mp.conj(p)*r
+    qs = mp.conj(q)*s
+
+    # Precomposing with complex conjugation sends (a0,a1,a2,a3) to (a0,a1,-a2,a3).
+    σ = 1 if oph else -1
+
+    return mp.matrix([[ abs(p)**2, -2*pr.real,    2*σ*pr.imag,       abs(r)**2 ],
+                      [ -pq.real,  (ps+rq).real,  -σ*(ps-rq).imag,   -rs.real  ],
+                      [ -pq.imag,  (ps+rq).imag,  σ*(ps-rq).real,    -rs.imag  ],
+                      [ abs(q)**2, -2*qs.real,    2*σ*qs.imag,       abs(s)**2 ]])
 
 def normalise_mobius_pair(A,B):
     """ Simultaneously normalise two Mobius transformations.
@@ -557,11 +811,19 @@ def normalise_mobius_pair(A,B):
 
 def mobius_fixed_points(M):
     """ Return a list of the fixed points of the transformation M.
+
+        For complex (or real) NumPy matrices the computation is done in machine precision with Python complex
+        numbers, rather than by passing NumPy scalars through mpmath; other matrices are handled by mpmath.
     """
-    a = M[0,0]
-    b = M[0,1]
-    c = M[1,0]
-    d = M[1,1]
+    if isinstance(M, np.ndarray) and M.dtype != object:
+        (a, b), (c, d) = M.astype(complex).tolist()
+        sqrt = cmath.sqrt
+    else:
+        a = M[0,0]
+        b = M[0,1]
+        c = M[1,0]
+        d = M[1,1]
+        sqrt = mp.sqrt
 
     if c == 0:
         if d-a == 0:
@@ -569,11 +831,14 @@ def mobius_fixed_points(M):
         else:
             return [mp.inf, b/(a-d)]
     else:
-        Δ = (d-a)**2 + 4*b*c
+        t = d-a
+        Δ = t*t + 4*b*c
+        inv2c = 1/(2*c)
         if Δ == 0:
-            return [-(d-a)/(2*c)]
+            return [-t*inv2c]
         else:
-            return [(-(d-a)+mp.sqrt(Δ))/(2*c), (-(d-a)-mp.sqrt(Δ))/(2*c)]
+            sqrtΔ = sqrt(Δ)
+            return [(-t+sqrtΔ)*inv2c, (-t-sqrtΔ)*inv2c]
 
 
 def circle_through_points(z1,z2,z3):
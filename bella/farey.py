@@ -302,6 +302,33 @@ def farey_polynomial(r,s,trX,trY,trXY):
 
     return constant - farey_polynomial(p1,q1,trX,trY,trXY)*farey_polynomial(p2,q2,trX,trY,trXY) - farey_polynomial(abs(p1-p2),abs(q1-q2),trX,trY,trXY)
 
+def farey_traces_bfs(trX, trY, trXY, end = None):
+    """ Yield ((r,s), tr W_r/s) for every fraction r/s with denominator < `end`, in the order of walk_tree_bfs().
+
+        The trace of each Farey word is computed from the traces of the words of its Farey neighbours by the
+        recursion used in farey_polynomial(), so each one costs a constant number of arithmetic operations.
+
+        Arguments:
+          trX, trY, trXY -- the values of the traces of X, Y, and XY (numbers rather than polynomials, or NumPy
+            arrays of numbers to compute the traces for many groups at once).
+          end -- as in walk_tree_bfs().
+    """
+
+    values = {}
+    for (r,s) in walk_tree_bfs(end):
+        if (r,s) == (0,1):
+            v = trX*trY - trXY
+        elif (r,s) == (1,1):
+            v = trXY
+        elif (r,s) == (1,2):
+            v = trX**2 + trY**2 + trXY**2 - trX*trY*trXY - 2
+        else:
+            (p1,q1),(p2,q2) = neighbours(r,s)
+            constant = trX**2 + trY**2 if s % 2 == 0 else 2*trX*trY
+            v = constant - values[(p1,q1)]*values[(p2,q2)] - values[(abs(p1-p2),abs(q1-q2))]
+        values[(r,s)] = v
+        yield (r,s), v
+
 def farey_polynomial_classic(r,s,p,q):
     """ Return the Farey polynomial of slope r/s as a numpy.polynomial.Polynomial object, from generator orders
 
@@ -505,8 +532,8 @@ def newtons_method(f, z0, df = None, tol_re = 1e-10, tol_im = 1e-20):
 def real_point_on_circle(f, R, angle, tol=None):
     """ Find the point on the circle |z| = R where Im f(z) = 0 with arg closest to angle.
     """
-    actual_function = lambda theta: ( f(R*mp.exp(1j * theta)) ).imag
-    return R*mp.exp(1j*mp.findroot(actual_function, angle, tol=tol))
+    actual_function = lambda theta: ( f(R*mp.expj(theta)) ).imag
+    return R*mp.expj(mp.findroot(actual_function, angle, tol=tol))
 
 def approximate_pleating_ray(r, s, p, q, R = 20, N = 10):
     """ Return points on the r/s pleating ray of the (p,q)-Riley slice.
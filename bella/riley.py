@@ -4,10 +4,20 @@
 from mpmath import mp
 from . import cayley
 from . import farey
-import functools
+import collections
+import itertools
+import numpy as np
 from numpy.polynomial import Polynomial as P
 from enum import Enum, auto
 
+# Exact values of e^(iπ/p) for the most common orders p, as functions so that they are computed at the current precision.
+_UNIT_ROOTS = {
+    2: lambda: mp.mpc(0, 1),
+    3: lambda: mp.mpc(0.5, mp.sqrt(3)/2),
+    4: lambda: mp.mpc(1, 1)/mp.sqrt(2),
+    6: lambda: mp.mpc(mp.sqrt(3)/2, 0.5),
+}
+
 class RileyGroup(cayley.GroupCache):
     """ Represents a Riley group.
 
@@ -21,10 +31,15 @@ class RileyGroup(cayley.GroupCache):
         In words represented as strings, x and y represent the inverses of X and Y respectively.
 
     """
-    def __init__(self, θ, η, μ, p=mp.inf, q=mp.inf):
+    __slots__ = ('θ', 'η', 'α', 'β', 'μ', 'trX', 'trY', 'trXY', 'generator_map', '_word_table',
+                 '_farey_mat_cache', '_farey_fp_cache', '_bfs_traces', '_bfs_trace_walk')
+
+    def __init__(self, θ, η, μ, p=None, q=None, cache_size=1<<16):
         """ Construct the Riley group on generators of holonomy angle θ and η with parameter μ.
 
-            For the underlying group to know about finite-order generators, set p and q to the orders of X and Y.
+            For the underlying group to know about finite-order generators, set p and q to the orders of X and Y
+            (leave them as None, or infinite, if the generators have infinite order). The number of words and Farey matrices
+            remembered is bounded by cache_size, as for cayley.GroupCache.
         """
 
         # Riley groups only make sense when η and θ are REAL and μ is complex.
@@ -37,61 +52,265 @@ class RileyGroup(cayley.GroupCache):
         relations = []
 
         def generator(index, angle, order):
-            if order != mp.inf:
-                relations.append((index,)*order)
-            return mp.exp(1j*angle)
+            if order is not None and mp.isinf(order):
+                order = None
+            if order is not None:
+                relations.append((index,)*int(order))
+            if order in _UNIT_ROOTS and angle == mp.pi/order:
+                return _UNIT_ROOTS[order]()
+            return mp.expj(angle)
 
         self.θ = θ
         self.η = η
-        self.trX, self.trY, self.trXY = traces_from_holonomies(θ,η)
         self.α = generator(0, θ, p)
         self.β = generator(1, η, q)
         self.μ = μ
-        X = mp.matrix([[self.α,1],[0,self.α.conjugate()]])
-        Y = mp.matrix([[self.β,0],[self.μ,self.β.conjugate()]])
+        self.trX, self.trY, self.trXY = _traces_from_multipliers(self.α, self.β)
+        αc = self.α.conjugate()
+        βc = self.β.conjugate()
+        X = mp.matrix([[self.α,1],[0,αc]])
+        Y = mp.matrix([[self.β,0],[self.μ,βc]])
+        # X and Y have determinant 1, so their inverses are their adjugates.
+        x = mp.matrix([[αc,-1],[0,self.α]])
+        y = mp.matrix([[βc,0],[-self.μ,self.β]])
+
+        super().__init__([X,Y], relations, cache_size=cache_size, inverses=[x,y])
+        self.generator_map = {'X':0, 'Y':1, 'x':2, 'y':3}
+
+        # Translation table taking the ASCII code of each letter to its index, and everything else to 255.
+        table = bytearray([255])*256
+        for c, n in self.generator_map.items():
+            table[ord(c)] = n
+        self._word_table = bytes(table)
+
+        # Farey matrices and their fixed points, keyed by (r,s), in order of last use.
+        self._farey_mat_cache = collections.OrderedDict()
+        self._farey_fp_cache = collections.OrderedDict()
 
-        super().__init__([X,Y], relations)
-        self.generator_map = {'X':0, 'Y':1, 'x':self.gen_to_inv[0], 'y':self.gen_to_inv[1]}
+        # Traces of the Farey words of the slopes in _bfs_slopes(), in the same order, and the walk producing them.
+        self._bfs_traces = []
+        self._bfs_trace_walk = None
 
     def string_to_word(self, s):
         """ Produce a word in the GroupCache sense from a string of letters out of X, Y, x, y. """
-        return tuple(functools.reduce( (lambda x,y: x + (self.generator_map[y],)), s, tuple()))
+        if not isinstance(s, str):
+            s = ''.join(s)
+        word = s.encode('ascii', errors='replace').translate(self._word_table)
+        if 255 in word:
+            raise ValueError(f"{s!r} is not a string in the letters X, Y, x, y")
+        return tuple(word)
 
-    @functools.cache
     def farey_polynomial(self,r,s):
         return farey.farey_polynomial(r,s,self.trX,self.trY,self.trXY)
 
-    @functools.cache
     def farey_matrix(self, r, s):
         """ Return the r/s-Farey matrix in this group. """
-        return self[self.string_to_word(farey.farey_word(r,s))]
+        cache = self._farey_mat_cache
+        M = cache.get((r,s))
+        if M is None:
+            # Farey words of nearby slopes share long prefixes, so evaluate them prefix by prefix.
+            M = self.prefix_product(self.string_to_word(farey.farey_word(r,s)))
+            self._remember(cache, (r,s), M)
+        else:
+            cache.move_to_end((r,s))
+        return M
 
-    @functools.cache
     def farey_fixed_points(self, r, s):
-        """ Return the fixed points of the r/s-Farey matrix in this group. """
-        return self.fixed_points(self.string_to_word(farey.farey_word(r,s)))
+        """ Return a tuple of the fixed points of the r/s-Farey matrix in this group. """
+        cache = self._farey_fp_cache
+        fp = cache.get((r,s))
+        if fp is None:
+            # A tuple, so that callers cannot change the cached value.
+            fp = tuple(cayley.mobius_fixed_points(self.farey_matrix(r,s)))
+            self._remember(cache, (r,s), fp)
+        else:
+            cache.move_to_end((r,s))
+        return fp
 
-    def guess_radial_coordinate(self, ε):
+    def prefill_farey(self, depth):
+        """ Compute and store the Farey matrices of all slopes r/s with s < `depth`.
+
+            The slopes are visited in the order of farey.walk_tree_bfs(), so that the products of
+            common prefixes of the Farey words are shared.
+        """
+        for (r,s) in farey.walk_tree_bfs(depth):
+            self.farey_matrix(r,s)
+
+    def guess_radial_coordinate(self, ε, batch=1024, precision='full', max_iter=10_000):
         """ Attempt to guess the Keen-Series coordinate of the group.
 
             More precisely, iterate over all possible r/s so that the Farey word
             W_r/s has trace in the cone of angle π*ε symmetric about the negative real
             axis; so if ε = 1 we are checking inclusion in our thickened neighbourhoods.
+
+            Only the first `max_iter` slopes of farey.walk_tree_bfs() are tried, and None is returned if none of
+            them pass (for groups in the interior of the Riley slice no slope ever does).
+
+            The slopes are taken from the Farey tree in batches (of size doubling up to `batch`)
+            and the cone test is done on each batch at once.
+
+            If `precision` is 'fast' then the traces are computed in machine precision by the recursion
+            for Farey polynomials (compiled with Numba if it is installed), rather than by evaluating the
+            polynomials in mpmath; traces too large for a float never pass the cone test in this mode. If
+            `precision` is 'full' (the default) the traces are computed at the working precision.
         """
-        for (r,s) in farey.walk_tree_bfs():
-            poly = farey.farey_polynomial(r, s, *traces_from_holonomies(self.θ,self.η))
-            v = poly(self.μ)
-            if v.real < -2:
-                θ = 2*mp.atan(mp.fabs(v.imag/v.real))
-                if θ/mp.pi < ε:
-                    return (r,s)
+        if precision not in ('full', 'fast'):
+            raise ValueError(f"precision should be 'full' or 'fast', not {precision!r}")
+        if batch < 1:
+            raise ValueError(f"batch should be at least 1, not {batch!r}")
+
+        if precision == 'fast':
+            return self._guess_radial_coordinate_fast(ε, max_iter)
+
+        bounds = _cone_bounds(ε)
+        start, size = 0, 1
+        while start < max_iter:
+            size = min(size, max_iter - start)
+            chunk = _bfs_slopes(start + size)[start:start + size]
+            values = self._farey_traces(start + size)[start:start + size]
+            hits = np.flatnonzero(_in_cone(values, *bounds))
+            if len(hits) > 0:
+                return chunk[hits[0]]
+            start += size
+            size = min(2*size, batch)
+        return None
+
+    def _farey_traces(self, n):
+        """ Return a list whose first n entries are the traces of the Farey words of the first n slopes of _bfs_slopes().
+
+            The traces are computed by farey.farey_traces_bfs(), which walks the slopes in the same order, and
+            they are remembered, so repeated calls of guess_radial_coordinate() (e.g. for decreasing ε) only
+            evaluate the polynomials of slopes which were not reached before.
+        """
+        values = self._bfs_traces
+        if len(values) < n:
+            if self._bfs_trace_walk is None:
+                self._bfs_trace_walk = farey.farey_traces_bfs(self.trX(self.μ), self.trY(self.μ), self.trXY(self.μ))
+            values.extend(v for (_, v) in itertools.islice(self._bfs_trace_walk, n - len(values)))
+        return values
+
+    def _guess_radial_coordinate_fast(self, ε, max_iter):
+        """ guess_radial_coordinate() in machine precision. """
+        if max_iter <= 0:
+            return None
+        traces = (complex(self.trX(self.μ)), complex(self.trY(self.μ)), complex(self.trXY(self.μ)))
+        tan_bound = _cone_bounds(ε)[0]
+
+        # Search every slope up to the denominator of the last one allowed, and then discard the result if it
+        # comes after that slope (slopes are ordered by denominator and then numerator).
+        last_r, last_s = _bfs_slopes(max_iter)[max_iter-1]
+        with np.errstate(over='ignore', invalid='ignore'):
+            r, s = _first_slope_in_cone(*traces, tan_bound, last_s + 1)
+        if s > 0 and (s, r) <= (last_s, last_r):
+            return (int(r), int(s))
+        return None
 
 
+# The slopes of farey.walk_tree_bfs(), in order, as far as they have been needed (shared by all groups).
+_bfs_slopes_list = []
+_bfs_slopes_walk = farey.walk_tree_bfs()
+
+def _bfs_slopes(n):
+    """ Return a list whose first n entries are the first n slopes yielded by farey.walk_tree_bfs(). """
+    if len(_bfs_slopes_list) < n:
+        _bfs_slopes_list.extend(itertools.islice(_bfs_slopes_walk, n - len(_bfs_slopes_list)))
+    return _bfs_slopes_list
+
+def _cone_bounds(ε):
+    """ Return tan(π*ε/2) as a float and at full precision, or infinity if ε >= 1; see _in_cone(). """
+    # The angle between v and the negative real axis is less than π*ε/2 iff |Im v| < -Re v * tan(π*ε/2),
+    # so no inverse tangents are needed. The cone is everything left of the axis once ε >= 1.
+    if ε >= 1:
+        return np.inf, mp.inf
+    mp_tan_bound = mp.tan(ε*mp.pi/2)
+    return float(mp_tan_bound), mp_tan_bound
+
+def _in_cone(values, tan_bound, mp_tan_bound):
+    """ Return a boolean array recording which of `values` have real part < -2 and lie in the cone
+        of angle π*ε symmetric about the negative real axis, where the bounds are _cone_bounds(ε).
+    """
+    v = np.array(values, dtype=complex)
+    with np.errstate(invalid='ignore'):
+        inside = (v.real < -2) & (np.abs(v.imag) < -v.real*tan_bound)
+
+    # Traces of long Farey words can be too large for a float, so test those at full precision.
+    if not np.isfinite(v).all():
+        for n in np.flatnonzero(~np.isfinite(v)):
+            z = values[n]
+            inside[n] = z.real < -2 and mp.fabs(z.imag) < -z.real*mp_tan_bound
+    return inside
+
+def _first_slope_in_cone(trX, trY, trXY, tan_bound, end):
+    """ Return the first slope r/s with s < `end`, in the order of farey.walk_tree_bfs(), whose Farey trace
+        has real part < -2 and imaginary part less than -tan_bound times the real part; or (-1,-1) if there is none.
+
+        The traces are computed from the values trX, trY, trXY by the recursion of farey.farey_polynomial(), and
+        the trace of r/s is stored at index s(s+1)/2 + r. This is written in terms of scalars so that it can be
+        compiled by Numba.
+    """
+    values = np.zeros(end*(end+1)//2, dtype=np.complex128)
+    for s in range(1, end):
+        for r in range(0, s+1):
+            if s == 1:
+                v = trX*trY - trXY if r == 0 else trXY
+            elif s == 2:
+                if r != 1:
+                    continue
+                v = trX*trX + trY*trY + trXY*trXY - trX*trY*trXY - 2
+            else:
+                # Find q1 = 1/r mod s; then p1/q1 and (r-p1)/(s-q1) are the Farey neighbours of r/s.
+                a, b, x0, x1 = r, s, 1, 0
+                while b != 0:
+                    k = a // b
+                    a, b = b, a - k*b
+                    x0, x1 = x1, x0 - k*x1
+                if a != 1:
+                    continue
+                q1 = x0 % s
+                p1 = (r*q1 - 1)//s
+                p2, q2 = r - p1, s - q1
+                constant = trX*trX + trY*trY if s % 2 == 0 else 2*trX*trY
+                v = (constant - values[q1*(q1+1)//2 + p1]*values[q2*(q2+1)//2 + p2]
+                     - values[abs(q1-q2)*(abs(q1-q2)+1)//2 + abs(p1-p2)])
+            values[s*(s+1)//2 + r] = v
+            if v.real < -2 and abs(v.imag) < -v.real*tan_bound:
+                return r, s
+    return -1, -1
+
+_first_slope_in_cone = cayley._maybe_njit(_first_slope_in_cone)
+
+def guess_radial_coordinates_batch(p, q, μs, ε, end=64):
+    """ Guess the Keen-Series coordinates of the classical Riley groups with generators of order p and q
+        and parameters μs all at once, in machine precision.
+
+        This is ClassicalRileyGroup(p,q,μ).guess_radial_coordinate(ε, precision='fast') for every μ in μs,
+        except that only slopes r/s with s < `end` are tried. The traces of each Farey word are computed for all
+        the μs together by farey.farey_traces_bfs(), so memory use grows like end^2 * len(μs).
+
+        Returns an integer array with a row (r,s) for each μ, which is (-1,-1) if no slope was found.
+    """
+    trX, trY, trXY = traces_from_holonomies(mp.pi/p, mp.pi/q)
+    trX, trY = complex(trX(0)), complex(trY(0))
+    trXY = complex(trXY(0)) + np.asarray(μs, dtype=np.complex128).ravel()
+    tan_bound = _cone_bounds(ε)[0]
+
+    result = np.full((len(trXY), 2), -1)
+    pending = np.ones(len(trXY), dtype=bool)
+    with np.errstate(over='ignore', invalid='ignore'):
+        for (r,s), v in farey.farey_traces_bfs(trX, trY, trXY, end):
+            hits = pending & (v.real < -2) & (np.abs(v.imag) < -v.real*tan_bound)
+            result[hits] = (r,s)
+            pending &= ~hits
+            if not pending.any():
+                break
+    return result
+
 def traces_from_holonomies(θ,η):
     """ Return (trX,trY,trXY) for given holonomy values. """
-    α = mp.exp(1j*θ)
-    β = mp.exp(1j*η)
+    return _traces_from_multipliers(mp.expj(θ), mp.expj(η))
 
+def _traces_from_multipliers(α, β):
+    """ Return (trX,trY,trXY) for the Riley group whose generators have diagonals (α, α*) and (β, β*). """
     return (P([mp.chop(α + mp.conj(α))]),
             P([mp.chop(β + mp.conj(β))]),
             P([mp.chop(α*β + mp.conj(α*β)), 1]))
@@ -99,8 +318,10 @@ def traces_from_holonomies(θ,η):
 class ClassicalRileyGroup(RileyGroup):
     """ Represents a Riley group generated by either *finite order* elliptics or parabolics.
     """
-    def __init__(self, p, q, μ):
-        super().__init__(mp.pi/p, mp.pi/q, μ, p, q)
+    __slots__ = ()
+
+    def __init__(self, p, q, μ, cache_size=1<<16):
+        super().__init__(mp.pi/p, mp.pi/q, μ, p, q, cache_size=cache_size)
 
 class RileyCuspGroup(ClassicalRileyGroup):
     """ Represents a rational cusp group.
@@ -108,9 +329,12 @@ class RileyCuspGroup(ClassicalRileyGroup):
         Arguments:
           p,q -- orders of the generators
           r,s -- order of the cusp
+          cache_size -- as for RileyGroup
     """
-    def __init__(self, p, q, r, s):
+    __slots__ = ()
+
+    def __init__(self, p, q, r, s, cache_size=1<<16):
         ray = farey.approximate_pleating_ray(r,s, p,q, R=20, N=100)
         μ = ray[-1]
-        super().__init__(p, q, μ)
+        super().__init__(p, q, μ, cache_size=cache_size)
 
@@ -1,6 +1,9 @@
 import pytest
 from bella import cayley
 from mpmath import mp
+import numpy as np
+import itertools
+import random
 
 def matrix_almosteq_up_to_sign(M,N):
     return matrix_almosteq(M,N) or matrix_almosteq(M,-N)
@@ -66,8 +69,10 @@ def test_generators_from_circle_inversions():
 
 def test_basic_invariants():
     bad_det = mp.matrix([[1,2],[3,4]])
-    with pytest.warns(cayley.NonUnitDeterminantWarning) as e_info:
+    with pytest.warns(cayley.NonUnitDeterminantWarning, match="generator 0 does not seem to have unit determinant") as e_info:
         assert cayley.GroupCache([bad_det])
+    with pytest.warns(cayley.NonUnitDeterminantWarning, match="generator 0 does not seem to have unit determinant") as e_info:
+        assert cayley.GroupCache([np.array([[1,2],[3,4]], dtype=complex)])
     λ = 2+3j
     X = mp.matrix([[λ,0],[0,λ**-1]])
     Y = mp.matrix([[-1j*(4+3j), -1j],[-1j, 0]])
@@ -117,8 +122,6 @@ def test_circle_space():
 
     mult_inverse = cayley.action_on_circles(mp.matrix([[0,1j],[1j,0]]))
     M1L1 = mult_inverse @ horizontal_line
-    mp.nprint(C1)
-    mp.nprint(M1L1)
     assert mp.chop(M1L1/M1L1[0],10**-10) == mp.chop(C1/C1[0], 10**-10)
 
     vertical_line = cayley.line_in_circle_space(0, 1j)
@@ -144,3 +147,133 @@ def test_circle_space():
     M = cayley.action_on_circles(mp.matrix([[1,0],[4j,1]]))
     image = M @ horizontal_line_2
     assert mp.chop(image/image[0]) == circle_2
+
+def test_long_words():
+    # Evaluating a word should not depend on the recursion limit.
+    G = cayley.GroupCache([mp.matrix([[1,1],[0,1]]), mp.matrix([[1,0],[2,1]])])
+    assert G[(0,)*5000] == mp.matrix([[1,5000],[0,1]])
+    assert G[(2,)*5000] == mp.matrix([[1,-5000],[0,1]])
+    assert matrix_almosteq(G[(1,0,0)], G[(1,)] @ G[(0,0)])
+
+def test_limit_set_mc():
+    # For the cyclic group generated by z -> z+1, every walk is of the form X^k or x^k,
+    # so the orbit of 0 along a walk is 1,2,3,... or -1,-2,-3,...
+    for X in [mp.matrix([[1,1],[0,1]]), np.array([[1,1],[0,1]], dtype=complex)]:
+        G = cayley.GroupCache([X])
+        for rtl, precision in itertools.product([True, False], ['full', 'fast']):
+            df = G.coloured_limit_set_mc(5, 10, rtl=rtl, precision=precision)
+            assert len(df) == 50
+            assert list(df['y']) == [0]*50
+            for n in range(10):
+                walk = df.iloc[5*n:5*(n+1)]
+                sign = 1 if walk['colour'].iloc[0] == 0 else -1
+                assert list(walk['x']) == [sign*k for k in range(1,6)]
+                assert list(walk['colour']) == [walk['colour'].iloc[0]]*5
+
+    # Seeding the random module makes every path reproducible
+    G = cayley.GroupCache([mp.matrix([[1,1],[0,1]]), mp.matrix([[1,0],[2,1]])])
+    H = cayley.GroupCache([np.array([[1,1],[0,1]], dtype=complex), np.array([[1,0],[2,1]], dtype=complex)])
+    for K, precision in [(G, 'full'), (G, 'fast'), (H, 'full')]:
+        random.seed(1)
+        df1 = K.coloured_limit_set_mc(6, 8, precision=precision)
+        random.seed(1)
+        df2 = K.coloured_limit_set_mc(6, 8, precision=precision)
+        assert df1.equals(df2)
+
+def test_action_on_circles_pointwise():
+    # The image of a circle should pass through the images of points on the circle.
+    on_circle = lambda v, z: v[0]*mp.fabs(z)**2 - 2*(v[1]*z.real + v[2]*z.imag) + v[3]
+    M = mp.matrix([[2+1j, 1],[3j, (2+3j)/(2+1j)]])
+    N = mp.matrix([[1+1j, 2],[0, 1/(1+1j)]])
+    circle = cayley.circle_in_circle_space(mp.mpc(1,-2), mp.mpf(3))
+    points = [mp.mpc(1,-2) + 3*mp.expj(t) for t in [0, 1, 2.5]]
+    for A in [M, N]:
+        for oph in [True, False]:
+            image = cayley.action_on_circles(A, oph) @ circle
+            for z in points:
+                w = mp.conj(z) if not oph else z
+                w = (A[0,0]*w + A[0,1])/(A[1,0]*w + A[1,1])
+                assert mp.almosteq(on_circle(image, w)/mp.mnorm(image,1), 0, 1e-50)
+
+def test_cayley_graph_with_relators():
+    X = mp.matrix([[mp.expj(mp.pi/3),1],[0,mp.expj(-mp.pi/3)]])
+    Y = mp.matrix([[1,0],[3j,1]])
+    G = cayley.GroupCache([X,Y], [(0,0,0)])
+    assert not G.is_reduced_from_left((0,0,0,1))
+    assert not G.is_reduced_from_left((2,2,2))
+    assert G.is_reduced_from_left((0,0,1,0))
+    assert G.is_reduced_from_left(())
+    words = list(G.cayley_graph_bfs(3))
+    assert len(words) == 4 + 12 + 34
+    assert all(G.is_reduced_from_left(w) for w in words)
+
+def test_isometric_circles_dataframe():
+    S = mp.matrix([[0,-1],[1,0]])
+    T = mp.matrix([[1,1],[0,1]])
+    G = cayley.GroupCache([S,T])
+    df = G.coloured_isometric_circles_bfs(1)
+    assert list(df.columns) == ['x','y','radius','colour']
+    assert list(df['colour']) == [0,2]
+    assert list(df['x']) == [0,0] and list(df['y']) == [0,0] and list(df['radius']) == [1,1]
+
+def test_free_cayley_graph_bfs():
+    G = cayley.GroupCache([mp.matrix([[1,2],[0,1]]), mp.matrix([[1,0],[2,1]])])
+    words = list(G.free_cayley_graph_bfs(5))
+    assert len(words) == sum(4*3**(n-1) for n in range(1,6))
+    assert [len(w) for w in words] == sorted(len(w) for w in words)
+    bounded = list(G.free_cayley_graph_bfs(5, max_frontier=20))
+    assert len(bounded) == len(words)
+    assert set(bounded) == set(words)
+
+def test_word_cache_size():
+    X = mp.matrix([[1,1],[0,1]])
+    Y = mp.matrix([[1,0],[1,1]])
+    G = cayley.GroupCache([X,Y], cache_size=10)
+    for w in G.free_cayley_graph_bfs(3):
+        product = mp.eye(2)
+        for x in w:
+            product = product @ G.generators[x]
+        assert matrix_almosteq(G[w], product)
+    assert len(G._word_cache) == 10
+
+def test_limit_set_fast():
+    # The walk never backtracks, so in the cyclic group generated by z -> z+1 the orbit of 0 is 1,2,3,... or -1,-2,-3,...
+    G = cayley.GroupCache([mp.matrix([[1,1],[0,1]])])
+    df = G.coloured_limit_set_fast(20)
+    sign = 1 if df['colour'].iloc[0] == 0 else -1
+    assert list(df['x']) == [sign*k for k in range(1,21)]
+    assert list(df['y']) == [0]*20
+
+def test_prefix_product():
+    G = cayley.GroupCache([mp.matrix([[1,1],[0,1]]), mp.matrix([[1,0],[1j,1]])])
+    words = [(0,1,1,2,3), (0,1,1,2), (0,1,3,3), (), (2,)]
+    for w in words:
+        assert matrix_almosteq(G.prefix_product(w), G[w])
+    # Only the distinct nonempty prefixes 0, 01, 011, 0112, 01123, 013, 0133 and 2 are stored
+    assert len(G._prefix_lru) == 8
+
+    # With a small cache old prefixes are forgotten, but the products are unchanged
+    G = cayley.GroupCache([mp.matrix([[1,1],[0,1]]), mp.matrix([[1,0],[1j,1]])], cache_size=5)
+    for w in itertools.product(range(4), repeat=3):
+        assert matrix_almosteq(G.prefix_product(w), G[w])
+        assert len(G._prefix_lru) <= 5
+
+def test_numpy_word_products():
+    X = np.array([[1,1],[0,1]])
+    Y = np.array([[1,0],[2j,1]])
+    G = cayley.GroupCache([X,Y])
+    H = cayley.GroupCache([mp.matrix(X.tolist()), mp.matrix(Y.tolist())])
+    for w in [(0,), (0,1,1,2,3), (3,3,0,1,2), (0,1,1,2)]:
+        for M in (G[w], G.prefix_product(w)):
+            assert isinstance(M, np.ndarray) and M.dtype == complex
+            assert np.allclose(M, np.array(H[w].tolist(), dtype=complex))
+
+def test_numpy_fixed_points():
+    M = np.array([[1+2j,3+1j],[0.5+1j,2-1j]])
+    M = M/np.sqrt(M[0,0]*M[1,1] - M[0,1]*M[1,0])
+    fps = cayley.mobius_fixed_points(M)
+    assert all(isinstance(z, complex) for z in fps)
+    for z, w in zip(fps, cayley.mobius_fixed_points(mp.matrix(M.tolist()))):
+        assert abs(z - complex(w)) < 1e-12
+        assert abs((M[0,0]*z + M[0,1])/(M[1,0]*z + M[1,1]) - z) < 1e-12
+    assert cayley.mobius_fixed_points(np.array([[1,2],[0,1]])) == [mp.inf]
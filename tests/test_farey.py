@@ -96,6 +96,14 @@ def test_poly():
     assert mp.almosteq(cayley.simple_tr(G.farey_matrix(5,17)), (G.farey_polynomial(5,17))(μ), 1e-90)
     assert mp.almosteq(cayley.simple_tr(G.farey_matrix(5,24)), (G.farey_polynomial(5,24))(μ), 1e-90)
 
+    # The trace recursion agrees with the polynomials
+    for μ in [2j, -9+2.3j]:
+        for (θ, η) in [(0,0), (mp.pi/3,mp.pi/4)]:
+            traces = riley.traces_from_holonomies(θ,η)
+            walk = farey.farey_traces_bfs(*(tr(μ) for tr in traces), 20)
+            for (r,s), v in walk:
+                assert mp.almosteq(v, farey.farey_polynomial(r,s,*traces)(μ), 1e-80)
+
     # Bug #21
     traces = riley.traces_from_holonomies(3,6)
     assert farey.farey_polynomial(2,3,*traces).coef[-1] == -1
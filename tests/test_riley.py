@@ -1,5 +1,6 @@
 import pytest
-from bella import riley,farey
+import warnings
+from bella import riley,farey,cayley
 import mpmath as mp
 
 
@@ -23,6 +24,41 @@ def test_radial():
     G = riley.ClassicalRileyGroup(mp.inf,mp.inf,-43)
     assert(G.guess_radial_coordinate(.001) == (1,1))
 
+    # Machine precision agrees on less delicate examples
+    for (p,q,μ) in [(mp.inf,mp.inf,4j), (mp.inf,mp.inf,43), (3,4,1.61+2j), (2,mp.inf,3+3j)]:
+        G = riley.ClassicalRileyGroup(p, q, μ)
+        assert G.guess_radial_coordinate(.1, precision='fast') == G.guess_radial_coordinate(.1)
+
+    # Groups in the interior of the slice have no slope
+    G = riley.ClassicalRileyGroup(3, 4, 0.01j)
+    assert G.guess_radial_coordinate(.1, max_iter=200) is None
+    assert G.guess_radial_coordinate(.1, max_iter=200, precision='fast') is None
+
+    # The iteration cap counts slopes in the order of walk_tree_bfs
+    G = riley.ClassicalRileyGroup(3, 4, 1.61+2j)
+    n = list(farey.walk_tree_bfs(28)).index((17,27))
+    for precision in ['full', 'fast']:
+        assert G.guess_radial_coordinate(.01, max_iter=n, precision=precision) is None
+        assert G.guess_radial_coordinate(.01, max_iter=n+1, precision=precision) == (17,27)
+
+    with pytest.raises(ValueError):
+        G.guess_radial_coordinate(.1, precision='Fast')
+    with pytest.raises(ValueError):
+        G.guess_radial_coordinate(.1, batch=0)
+
+    # Traces too large for a float fail the cone test quietly
+    G = riley.ClassicalRileyGroup(mp.inf, mp.inf, 7+300j)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert G.guess_radial_coordinate(1e-12, max_iter=20000, precision='fast') is None
+
+    # Traces found for one ε are reused for the next
+    G = riley.ClassicalRileyGroup(3, 4, 1.61+2j)
+    assert G.guess_radial_coordinate(.01) == (17,27)
+    n = len(G._bfs_traces)
+    assert G.guess_radial_coordinate(.1) == (4,5)
+    assert len(G._bfs_traces) == n
+
     # # hard examples should converge to something at least
     # G = riley.ClassicalRileyGroup(3, 4, 1.61+2j)
     # guesses = [G.guess_radial_coordinate(10**-exponent) for exponent in range(0,8)]
@@ -39,3 +75,75 @@ def test_radial():
     # # assert guesses[-1] == guesses[-2]
     # print(guesses[-1], guesses[-2])
 
+
+def test_radial_batch():
+    μs = [4j, 43, -43, 1.61+2j, 3+3j, 0.01j]
+    guesses = riley.guess_radial_coordinates_batch(3, 4, μs, .1, end=32)
+    assert guesses.shape == (len(μs), 2)
+    for μ, rs in zip(μs, guesses):
+        if rs[1] > 0:
+            assert tuple(rs) == riley.ClassicalRileyGroup(3, 4, μ).guess_radial_coordinate(.1, precision='fast')
+    assert tuple(guesses[-1]) == (-1,-1)
+
+def test_string_to_word():
+    G = riley.RileyGroup(mp.pi/3, mp.pi/4, 2+1j)
+    assert G.string_to_word('') == ()
+    assert G.string_to_word('XYxy') == (0,1,G.gen_to_inv[0],G.gen_to_inv[1])
+    assert G.string_to_word(('y','X','Y')) == (G.gen_to_inv[1],0,1)
+    assert G.string_to_word(farey.farey_word(3,5)) == G.string_to_word(''.join(farey.farey_word(3,5)))
+    assert G.inv_word(G.string_to_word('XXy')) == G.string_to_word('Yxx')
+    with pytest.raises(ValueError):
+        G.string_to_word('XZ')
+    with pytest.raises(ValueError):
+        G.string_to_word('Xμ')
+
+def test_farey_caches():
+    G = riley.RileyGroup(mp.pi/3, mp.pi/5, 2+3j)
+    G.prefill_farey(6)
+    assert len(G._farey_mat_cache) == len(list(farey.walk_tree_bfs(6)))
+    for (r,s) in farey.walk_tree_bfs(6):
+        word = G.string_to_word(farey.farey_word(r,s))
+        assert G.farey_matrix(r,s) == G[word]
+        assert G.farey_fixed_points(r,s) == tuple(G.fixed_points(word))
+
+    # Bounded caches forget old slopes but give the same answers
+    H = riley.RileyGroup(mp.pi/3, mp.pi/5, 2+3j, cache_size=8)
+    H.prefill_farey(12)
+    assert len(H._farey_mat_cache) == 8 and len(H._prefix_lru) == 8
+    for (r,s) in farey.walk_tree_bfs(6):
+        assert mp.mnorm(H.farey_matrix(r,s) - G.farey_matrix(r,s)) < 1e-90
+        assert H.farey_fixed_points(r,s) == tuple(cayley.mobius_fixed_points(H.farey_matrix(r,s)))
+    assert len(H._farey_fp_cache) == 8
+
+    H = riley.ClassicalRileyGroup(3, 4, 2+3j, cache_size=8)
+    H.prefill_farey(12)
+    assert len(H._farey_mat_cache) == 8
+
+def test_finite_order_relators():
+    G = riley.RileyGroup(mp.pi/3, mp.pi/4, 2+1j)
+    assert all(len(r) == 2 for r in G.relators)
+
+    G = riley.RileyGroup(mp.pi/3, mp.pi/4, 2+1j, 3, 4)
+    assert (0,0,0) in G.relators and (1,1,1,1) in G.relators
+
+    G = riley.ClassicalRileyGroup(mp.inf, 4, 2+1j)
+    assert (1,1,1,1) in G.relators and not any(set(r) == {0} for r in G.relators)
+
+    for inf in [mp.inf, float('inf')]:
+        G = riley.RileyGroup(0, 0, 2j, inf, inf)
+        assert all(len(r) == 2 for r in G.relators)
+
+def test_generator_inverses():
+    G = riley.RileyGroup(mp.pi/3, mp.pi/5, 2+3j)
+    assert G.generator_map == {'X':0, 'Y':1, 'x':2, 'y':3}
+    for w in ['Xx', 'xX', 'Yy', 'yY']:
+        assert mp.mnorm(G[G.string_to_word(w)] - mp.eye(2)) < 1e-90
+
+def test_exact_unit_roots():
+    G = riley.ClassicalRileyGroup(2, 3, 2+1j)
+    assert G.α == 1j
+    assert G.trX.coef[0] == 0 and G.trY.coef[0] == 1
+    assert mp.almosteq(G.β**3, -1, 1e-95)
+
+    G = riley.ClassicalRileyGroup(4, 6, 2+1j)
+    assert mp.almosteq(G.α, mp.expj(mp.pi/4), 1e-95) and mp.almosteq(G.β, mp.expj(mp.pi/6), 1e-95)